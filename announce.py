@@ -17,8 +17,15 @@ list of ASes that are prepended to the path.  In the PREPENDED status,
 an Announce stores a list with one or more entries of HOMEASN (e.g.,
 47065 47065 47065).  In the POISONED status, an Announce stores a list
 of ASes or AS sets that terminate with HOMEASN (e.g., 704 6639 {73 88}
-47065).  These lists do not include the instance of HOMEASN that is
-automatically appended by the AS that receives the announcement.
+47065).  AS sets are stored as sorted tuples of AS numbers.  These
+lists do not include the instance of HOMEASN that is automatically
+appended by the AS that receives the announcement.
+
+The statement `a <<= spec' changes a in place.  Announce.get instead
+returns one shared instance per spec string, and PrefixAnnounce.from_str
+and PrefixAnnounce.from_mux2str fill their muxes with these.  Shared
+instances refuse `<<=' with a TypeError; use `pfxa[mux] = spec' to
+change what such a mux announces.
 
 The PrefixAnnounce class encapsulates the announcement of a whole
 prefix; i.e., what each mux should announce.  The class is a wrapper
@@ -27,8 +34,11 @@ interesting features are support for checking if two instances of
 PrefixAnnounce are identical, and functions to dump (load) a
 PrefixAnnounce to (from) a string.'''
 
+import re
+
 HOMEASN = 47065
 MAX_AS_SET_SIZE = 10
+_HOMEASN_STR = str(HOMEASN)
 
 WITHDRAWN = 'withdrawn'
 ANNOUNCED = 'announced'
@@ -37,142 +47,434 @@ NOPREPEND = 'noprepend'
 PREPENDED = 'prepended'
 POISONED = 'poisoned'
 
+# Announce keeps its status as a bitmask; the status property maps it
+# back to a frozenset of the string constants above.
+_WITHDRAWN_BIT = 1
+_ANNOUNCED_BIT = 2
+_NOPREPEND_BIT = 4
+_PREPENDED_BIT = 8
+_POISONED_BIT = 16
+
+_BIT2STATUS = ((_WITHDRAWN_BIT, WITHDRAWN), (_ANNOUNCED_BIT, ANNOUNCED),
+		(_NOPREPEND_BIT, NOPREPEND), (_PREPENDED_BIT, PREPENDED),
+		(_POISONED_BIT, POISONED))
+_STATUS_SETS = dict((bits, frozenset(n for b, n in _BIT2STATUS if bits & b))
+		for bits in range(32))
+
+_STATUS_WITHDRAWN = _WITHDRAWN_BIT
+_STATUS_NOPREPEND = _ANNOUNCED_BIT | _NOPREPEND_BIT
+_STATUS_PREPENDED = _ANNOUNCED_BIT | _PREPENDED_BIT
+_STATUS_POISONED = _ANNOUNCED_BIT | _POISONED_BIT
+_STATUS_POISONED_PREPENDED = _ANNOUNCED_BIT | _POISONED_BIT | _PREPENDED_BIT
+
+# PREPENDED announcements differ only in length, so all Announce
+# instances with the same number of HOMEASN entries share one tuple.
+_PREPEND_CACHE = dict()
+_NO_POISONED = frozenset()
+
+# Announce.get hands out one shared instance per spec string.  The cache
+# is emptied when it fills up.
+MAX_ANNOUNCE_CACHE_SIZE = 4096
+_ANNOUNCE_CACHE = dict()
+
+# An AS path token is either an AS set in braces or a single AS number.
+# An unterminated AS set extends to the end of the string.
+_TOKEN_RE = re.compile(r'\{([^}]*)\}?|([^\s{]+)')
+
+# A PrefixAnnounce string is a list of 'mux: announce' entries separated
+# by semicolons.
+_PFXA_RE = re.compile(r'\s*([^:;\s][^:;]*?)\s*:\s*([^;]*?)\s*(?:;|$)')
+
 
 class Announce(object):#{{{
-	def __init__(self, spec=WITHDRAWN):#{{{
-		self.status = frozenset()
-		self.prepend = tuple()
-		self.poisoned = frozenset()
-		self.__ilshift__(spec)
-	#}}}
+	__slots__ = ('_status', '_prepend', '_poisoned', '_hash', '_str',
+			'_shared')
 
-	def __ilshift__(self, spec):#{{{
-		if spec == WITHDRAWN:
-			self.status = frozenset([WITHDRAWN])
-			self.prepend = None
-			self.poisoned = set()
-		elif spec == NOPREPEND:
-			self.status = frozenset([ANNOUNCED, NOPREPEND])
-			self.prepend = None
-			self.poisoned = set()
-		elif isinstance(spec, (str, unicode)):
-			self.prepend = parse_as_path_string(spec)
-			self._parse_update()
-		elif isinstance(spec, (tuple, list)):
+	def __init__(self, spec=WITHDRAWN):#{{{
+		tt = type(spec)
+		if tt is str or isinstance(spec, (str, unicode)):
+			if spec == WITHDRAWN:
+				self._status = _STATUS_WITHDRAWN
+				self._prepend = None
+				self._poisoned = _NO_POISONED
+			elif spec == NOPREPEND:
+				self._status = _STATUS_NOPREPEND
+				self._prepend = None
+				self._poisoned = _NO_POISONED
+			else:
+				self._prepend = parse_as_path_string(spec)
+				self._parse_update()
+		elif tt is tuple or tt is list or isinstance(spec, (tuple, list)):
 			self._parse_iter(spec)
 			self._parse_update()
 		else:
 			raise RuntimeError('%s unsupported' % spec.__class__)
+		self._hash = hash((self._status, self._prepend))
+		self._str = None
+		self._shared = False
+	#}}}
+
+	def __ilshift__(self, spec):#{{{
+		if self._shared:
+			raise TypeError('cannot modify an Announce shared by Announce.get')
+		self.__init__(spec)
 		return self
 	#}}}
 
+	@staticmethod
+	def get(spec):#{{{
+		if type(spec) is not str:
+			return Announce(spec)
+		announce = _ANNOUNCE_CACHE.get(spec)
+		if announce is None:
+			if len(_ANNOUNCE_CACHE) >= MAX_ANNOUNCE_CACHE_SIZE:
+				_ANNOUNCE_CACHE.clear()
+			announce = Announce(spec)
+			announce._shared = True # pylint: disable=W0212
+			_ANNOUNCE_CACHE[spec] = announce
+		return announce
+	#}}}
+
+	def __getstate__(self):#{{{
+		return (self._status, self._prepend)
+	#}}}
+
+	def __setstate__(self, state):#{{{
+		if isinstance(state, dict):
+			# Pickled before Announce had __slots__.
+			if state['prepend'] is not None:
+				self.__init__(list(state['prepend']))
+			elif WITHDRAWN in state['status']:
+				self.__init__(WITHDRAWN)
+			else:
+				self.__init__(NOPREPEND)
+			return
+		self._status, self._prepend = state
+		self._poisoned = None if self._prepend else _NO_POISONED
+		self._hash = hash((self._status, self._prepend))
+		self._str = None
+		self._shared = False
+	#}}}
+
+	@property
+	def prepend(self):#{{{
+		return self._prepend
+	#}}}
+
+	@property
+	def status(self):#{{{
+		return _STATUS_SETS[self._status]
+	#}}}
+
+	@property
+	def poisoned(self):#{{{
+		if self._poisoned is None:
+			poisoned = set()
+			for e in self._prepend:
+				if e == HOMEASN:
+					continue
+				if type(e) is int:
+					poisoned.add(e)
+				else:
+					poisoned.update(e)
+			self._poisoned = frozenset(poisoned)
+		return self._poisoned
+	#}}}
+
 	def __str__(self):#{{{
-		if WITHDRAWN in self.status:
-			return WITHDRAWN
-		elif NOPREPEND in self.status:
-			return NOPREPEND
-		else:
-			return dump_as_path_tuple(self.prepend)
+		if self._str is None:
+			if self._status & _WITHDRAWN_BIT:
+				self._str = WITHDRAWN
+			elif self._status & _NOPREPEND_BIT:
+				self._str = NOPREPEND
+			elif self._status == _STATUS_PREPENDED:
+				self._str = ' '.join([_HOMEASN_STR] * len(self._prepend))
+			else:
+				self._str = dump_as_path_tuple(self._prepend)
+		return self._str
 	#}}}
 
 	def __hash__(self):#{{{
-		return hash((self.status, self.prepend))
+		return self._hash
 	#}}}
 
 	def __eq__(self, other):#{{{
-		return hash(self) == hash(other)
+		if self is other:
+			return True
+		return (self.__class__ is other.__class__ and
+				self._hash == other._hash and
+				self._status == other._status and
+				self._prepend == other._prepend)
+	#}}}
+
+	def __ne__(self, other):#{{{
+		return not self.__eq__(other)
 	#}}}
 
 	def _parse_iter(self, iterable):#{{{
-		self.prepend = tuple(_parse_single_token(t) for t in iterable)
+		prepend = list()
+		for t in iterable:
+			tt = type(t)
+			if tt is int:
+				prepend.append(t)
+			elif tt is str:
+				prepend.append(int(t))
+			elif tt is tuple or tt is frozenset or tt is set:
+				prepend.append(_as_set_tuple(t))
+			else:
+				prepend.append(_token_from_obj(t))
+		self._prepend = tuple(prepend)
 	#}}}
 
 	def _parse_update(self):#{{{
-		assert self.prepend is not None and len(self.prepend) > 0
-		if self.prepend[-1] != HOMEASN:
-			self.prepend = tuple(list(self.prepend) + [HOMEASN])
-		assert self.prepend[-1] == HOMEASN
+		if not self._prepend or self._prepend[-1] != HOMEASN:
+			raise ValueError('AS path does not end with %d' % HOMEASN)
 
-		self.poisoned = set()
-		for e in self.prepend:
+		nhome = 0
+		has_non_home = False
+		for e in self._prepend:
 			if e == HOMEASN:
-				continue
-			if isinstance(e, int):
-				self.poisoned.add(e)
-			elif isinstance(e, frozenset):
-				assert len(e) <= MAX_AS_SET_SIZE
-				self.poisoned.update(e)
+				nhome += 1
+			elif type(e) is int:
+				has_non_home = True
+			elif type(e) is tuple:
+				if not e or len(e) > MAX_AS_SET_SIZE:
+					raise ValueError('AS set size must be between 1 and %d' %
+							MAX_AS_SET_SIZE)
+				has_non_home = True
 			else:
 				raise TypeError('%s unsupported' % e.__class__)
-		self.poisoned = frozenset(self.poisoned)
+		self._poisoned = None
 
-		if self.poisoned:
-			assert len(set(self.prepend)) > 1
-			if self.prepend.count(HOMEASN) == 1:
-				self.status = frozenset([ANNOUNCED, POISONED])
-			else:
-				self.status = frozenset([ANNOUNCED, POISONED, PREPENDED])
+		if not has_non_home:
+			self._status = _STATUS_PREPENDED
+			self._prepend = _intern_prepend(nhome)
+		elif nhome == 1:
+			self._status = _STATUS_POISONED
 		else:
-			assert set(self.prepend) == set([HOMEASN])
-			self.status = frozenset([ANNOUNCED, PREPENDED])
+			self._status = _STATUS_POISONED_PREPENDED
 	#}}}
 #}}}
 
 
-class PrefixAnnounce(dict):#{{{
-	def __init__(self):#{{{
-		super(PrefixAnnounce, self).__init__()
+class PrefixAnnounce(object):#{{{
+	__slots__ = ('_map', 'identifier', '_hash')
+
+	def __new__(cls):#{{{
+		# Set up in __new__ rather than __init__: unpickling a protocol 2
+		# pickle of the old dict subclass calls __setitem__ before
+		# __setstate__ without calling __init__.
+		self = object.__new__(cls)
+		self._map = dict()
 		self.identifier = None
+		self._hash = None
+		return self
+	#}}}
+
+	def __getstate__(self):#{{{
+		return (self._map, self.identifier)
+	#}}}
+
+	def __setstate__(self, state):#{{{
+		if isinstance(state, dict):
+			# Pickled when PrefixAnnounce subclassed dict; the items were
+			# already restored through __setitem__.
+			if state.get('identifier') is not None:
+				self.close()
+			return
+		self._map, self.identifier = state
+		self._hash = None
+		if self.identifier is not None:
+			self._hash = hash(self.identifier)
 	#}}}
 
 	def __setitem__(self, mux, spec):#{{{
+		self._hash = self.identifier = None
 		if isinstance(spec, Announce):
-			super(PrefixAnnounce, self).__setitem__(mux, spec)
+			self._map[mux] = spec
 		else:
-			super(PrefixAnnounce, self).__setitem__(mux, Announce(spec))
+			self._map[mux] = Announce(spec)
+	#}}}
+
+	def __getitem__(self, mux):#{{{
+		return self._map[mux]
+	#}}}
+
+	def __delitem__(self, mux):#{{{
+		self._hash = self.identifier = None
+		del self._map[mux]
+	#}}}
+
+	def __contains__(self, mux):#{{{
+		return mux in self._map
+	#}}}
+
+	def __iter__(self):#{{{
+		return iter(self._map)
+	#}}}
+
+	def __len__(self):#{{{
+		return len(self._map)
 	#}}}
 
 	def __hash__(self):#{{{
-		assert self.identifier is not None
-		return hash(self.identifier)
+		assert self._hash is not None
+		return self._hash
+	#}}}
+
+	def __eq__(self, other):#{{{
+		if isinstance(other, dict):
+			return self._map == other
+		if self.__class__ is not other.__class__:
+			return False
+		if (self._hash is not None and other._hash is not None and
+				self._hash != other._hash):
+			return False
+		return self._map == other._map
+	#}}}
+
+	def __ne__(self, other):#{{{
+		return not self.__eq__(other)
+	#}}}
+
+	def __repr__(self):#{{{
+		return 'PrefixAnnounce(%r)' % self.mux2str()
 	#}}}
 
 	def __str__(self):#{{{
-		return '; '.join('%s: %s' % (m, str(a))
-				for m, a in self.items())
+		return '; '.join(['%s: %s' % (m, str(a))
+				for m, a in self._map.items()])
 	#}}}
 
 	def is_poisoned(self): # {{{
-		for _m, a in self.items():
-			if POISONED in a.status: return True
+		for a in self._map.values():
+			if a._status & _POISONED_BIT: return True # pylint: disable=W0212
 		return False
 	# }}}
 
 	def close(self):#{{{
-		self.identifier = frozenset(self.items())
+		self.identifier = frozenset(self._map.items())
+		self._hash = hash(self.identifier)
+	#}}}
+
+	def items(self):#{{{
+		return self._map.items()
+	#}}}
+
+	def keys(self):#{{{
+		return self._map.keys()
+	#}}}
+
+	def values(self):#{{{
+		return self._map.values()
+	#}}}
+
+	def iteritems(self):#{{{
+		return self._map.iteritems()
+	#}}}
+
+	def iterkeys(self):#{{{
+		return self._map.iterkeys()
+	#}}}
+
+	def itervalues(self):#{{{
+		return self._map.itervalues()
+	#}}}
+
+	def viewitems(self):#{{{
+		return self._map.viewitems()
+	#}}}
+
+	def viewkeys(self):#{{{
+		return self._map.viewkeys()
+	#}}}
+
+	def viewvalues(self):#{{{
+		return self._map.viewvalues()
+	#}}}
+
+	def has_key(self, mux):#{{{
+		return mux in self._map
+	#}}}
+
+	def get(self, mux, default=None):#{{{
+		return self._map.get(mux, default)
+	#}}}
+
+	def setdefault(self, mux, spec=WITHDRAWN):#{{{
+		if mux not in self._map:
+			self[mux] = spec
+		return self._map[mux]
+	#}}}
+
+	def clear(self):#{{{
+		self._hash = self.identifier = None
+		self._map.clear()
+	#}}}
+
+	def popitem(self):#{{{
+		self._hash = self.identifier = None
+		return self._map.popitem()
+	#}}}
+
+	def pop(self, mux, *default):#{{{
+		self._hash = self.identifier = None
+		return self._map.pop(mux, *default)
+	#}}}
+
+	def update(self, *args, **kwargs):#{{{
+		for mux, spec in dict(*args, **kwargs).items():
+			self[mux] = spec
+	#}}}
+
+	def copy(self):#{{{
+		pfxa = PrefixAnnounce()
+		pfxa._map = self._map.copy() # pylint: disable=W0212
+		pfxa.identifier = self.identifier
+		pfxa._hash = self._hash # pylint: disable=W0212
+		return pfxa
+	#}}}
+
+	@staticmethod
+	def fromkeys(muxes, spec=WITHDRAWN):#{{{
+		pfxa = PrefixAnnounce()
+		for mux in muxes:
+			pfxa[mux] = spec
+		return pfxa
+	#}}}
+
+	def _bulk_set(self, mux2announce):#{{{
+		# Values must already be Announce instances.
+		self._hash = self.identifier = None
+		self._map.update(mux2announce)
 	#}}}
 
 	def mux2str(self):#{{{
-		return dict((mux, str(a)) for mux, a in self.items())
+		return {mux: str(a) for mux, a in self._map.items()}
 	#}}}
 
 	@staticmethod
 	def from_mux2str(mux2str):#{{{
 		pfxa = PrefixAnnounce()
-		for mux, string in mux2str.items():
-			pfxa[mux] = Announce(string)
+		pfxa._bulk_set({mux: Announce.get(string) # pylint: disable=W0212
+				for mux, string in mux2str.items()})
 		pfxa.close()
 		return pfxa
 	#}}}
 
 	@staticmethod
 	def from_str(string):#{{{
+		mux2announce = dict()
+		end = 0
+		for m in _PFXA_RE.finditer(string):
+			if m.start() != end:
+				raise ValueError('malformed entry: %r' % string[end:m.start()])
+			mux2announce[m.group(1)] = Announce.get(m.group(2))
+			end = m.end()
+		if end != len(string):
+			raise ValueError('malformed entry: %r' % string[end:])
 		pfxa = PrefixAnnounce()
-		for entry in string.split(';'):
-			mux, prepstr = entry.split(':')
-			mux = mux.strip()
-			prepstr = prepstr.strip()
-			pfxa[mux] = Announce(prepstr)
+		pfxa._bulk_set(mux2announce) # pylint: disable=W0212
 		pfxa.close()
 		return pfxa
 	#}}}
@@ -181,39 +483,62 @@ class PrefixAnnounce(dict):#{{{
 
 def parse_as_path_string(string):#{{{
 	prepend = list()
-	string = string.replace(',', ' ')
-	while '{' in string:
-		head, _sep, string = string.partition('{')
-		prepend.extend(_parse_single_token(t) for t in head.split())
-		head, _sep, string = string.partition('}')
-		asset = frozenset(_parse_single_token(t) for t in head.split())
-		prepend.append(asset)
-	prepend.extend(_parse_single_token(t) for t in string.split())
+	for m in _TOKEN_RE.finditer(string.replace(',', ' ')):
+		asn = m.group(2)
+		if asn is not None:
+			prepend.append(int(asn))
+		else:
+			prepend.append(_as_set_tuple(m.group(1).split()))
 	return tuple(prepend)
 #}}}
 
 def dump_as_path_tuple(tup):#{{{
 	tokens = list()
 	for e in tup:
-		if isinstance(e, int):
+		if type(e) is int:
 			tokens.append(str(e))
-		elif isinstance(e, frozenset):
-			tokens.append('{%s}' % ' '.join(str(i) for i in sorted(e)))
+		elif type(e) is tuple:
+			tokens.append('{%s}' % ' '.join(map(str, e)))
+		elif type(e) is frozenset:
+			tokens.append('{%s}' % ' '.join(map(str, sorted(e))))
 		else:
 			raise TypeError('%s unsupported' % e.__class__)
 	return ' '.join(tokens)
 #}}}
 
-def _parse_single_token(token):#{{{
-	if isinstance(token, (str, unicode)):
+def _token_from_obj(token):#{{{
+	# Announce._parse_iter handles exact int, str, and AS-set types inline;
+	# this covers unicode and subclasses.
+	if isinstance(token, basestring):
 		return int(token)
 	if isinstance(token, int):
-		return token
-	if isinstance(token, (set, frozenset)):
-		return frozenset(int(i) for i in token)
+		# Subclasses such as numpy integers; store a plain int.
+		return int(token)
+	if isinstance(token, (set, frozenset, tuple)):
+		return _as_set_tuple(token)
 	raise TypeError('%s unsupported' % token.__class__)
 #}}}
 
+def _as_set_tuple(iterable):#{{{
+	return tuple(sorted(set(map(int, iterable))))
+#}}}
+
+def _intern_prepend(length):#{{{
+	prepend = _PREPEND_CACHE.get(length)
+	if prepend is None:
+		prepend = (HOMEASN,) * length
+		_PREPEND_CACHE[length] = prepend
+	return prepend
+#}}}
+
+# The compiled parser falls back to _parse_as_path_string_py on input it
+# does not handle, so it must be loaded after that name is defined.
+_parse_as_path_string_py = parse_as_path_string
+try:
+	from announce_fast import parse_as_path_string # pylint: disable=F0401
+except ImportError:
+	pass
+
 
 def test_announce():#{{{
 	# pylint: disable=R0915
@@ -223,6 +548,7 @@ def test_announce():#{{{
 	assert not a.prepend
 	assert not a.poisoned
 	assert str(a) == WITHDRAWN
+	assert not hasattr(a, '__dict__')
 
 	a <<= NOPREPEND
 	assert ANNOUNCED in a.status
@@ -252,10 +578,22 @@ def test_announce():#{{{
 	assert len(a.status) == 2
 	assert len(a.prepend) == 3
 	assert not a.poisoned
+	assert str(a) == '47065 47065 47065'
 
 	b = Announce('47065,47065,47065')
 	assert a == b
 
+	pfx = PrefixAnnounce()
+	pfx['x'] = b2 = Announce('704 47065')
+	b2 <<= NOPREPEND
+	assert str(pfx['x']) == NOPREPEND
+	try:
+		b.prepend = (HOMEASN,)
+	except AttributeError:
+		pass
+	else:
+		assert False
+
 	c = Announce('47065, 47065 47065,47065')
 	assert a != c
 	assert ANNOUNCED in c.status
@@ -266,6 +604,9 @@ def test_announce():#{{{
 
 	d = Announce('47065 47065 47065 47065')
 	assert c == d
+	assert c.prepend is d.prepend
+	assert not c != d
+	assert c != str(c)
 
 	e = Announce('704 {34,35 36} 47065')
 	assert ANNOUNCED in e.status
@@ -274,6 +615,9 @@ def test_announce():#{{{
 	assert len(e.prepend) == 3
 	assert len(e.poisoned) == 4
 	assert str(e) == '704 {34 35 36} 47065'
+	assert str(e) is str(e)
+	assert e.prepend[1] == (34, 35, 36)
+	assert Announce(e.prepend) == e
 
 	f = Announce('704 {35 34 36} 47065')
 	assert e == f
@@ -286,6 +630,38 @@ def test_announce():#{{{
 	else:
 		assert False
 
+	try:
+		f <<= '{%s} 47065' % ' '.join(str(i) for i in range(MAX_AS_SET_SIZE+1))
+	except ValueError:
+		pass
+	else:
+		assert False
+
+	class MyInt(int):
+		pass
+	h = Announce([MyInt(704), u'705', set([45, 46]), frozenset([47]), HOMEASN])
+	assert type(h.prepend[0]) is int
+	class MySet(set):
+		pass
+	assert Announce([MySet([2, 1]), HOMEASN]).prepend == ((1, 2), HOMEASN)
+	assert POISONED in h.status
+	assert len(h.poisoned) == 5
+	assert str(h) == '704 705 {45 46} {47} 47065'
+
+	# Only meaningful once announce_fast is built; `make test' does that.
+	for path in ['704 {34,35 36} 47065', '{704} {705} {45 46} 47065',
+			'47065,47065', '1 {3 2', u'704\t47065', '{}', '',
+			'9' * 19 + ' 47065', '-1 +2 47065']:
+		assert parse_as_path_string(path) == _parse_as_path_string_py(path)
+	for path in ['1 }', '1 {2 {3}', 'x', '47065\x00', u'1\xa02']:
+		for parse in [parse_as_path_string, _parse_as_path_string_py]:
+			try:
+				parse(path)
+			except ValueError:
+				pass
+			else:
+				assert False
+
 	g = Announce('{704} {705} {45 46} 47065')
 	assert ANNOUNCED in g.status
 	assert POISONED in g.status
@@ -297,6 +673,8 @@ def test_announce():#{{{
 
 
 def test_prefix_announce():#{{{
+	import pickle
+
 	a = Announce('704 {34,35 36} 47065')
 
 	pfxa = PrefixAnnounce()
@@ -307,6 +685,92 @@ def test_prefix_announce():#{{{
 
 	pfxb = PrefixAnnounce.from_str(s)
 	assert pfxb == pfxa
+	assert hash(pfxb) == hash(pfxa)
+	assert pfxb['wisc'] == a
+	assert len(pfxb) == 2
+
+	pfxb['wisc'] = NOPREPEND
+	pfxb.close()
+	assert pfxb != pfxa
+
+	pfxd = pfxb.copy()
+	assert pfxd == pfxb
+	pfxd['wisc'] = a
+	assert pfxd.identifier is None
+	assert pfxd == pfxa
+	pfxd.update(gatech=NOPREPEND)
+	assert pfxd.pop('gatech') == Announce(NOPREPEND)
+	assert dict(pfxd.iteritems()) == {'wisc': a}
+	assert repr(pfxd) == "PrefixAnnounce({'wisc': '704 {34 35 36} 47065'})"
+	assert pfxd == {'wisc': a}
+	assert pfxd.has_key('wisc')
+	assert pfxd.setdefault('ucla', NOPREPEND) == Announce(NOPREPEND)
+	assert pfxd.setdefault('ucla', '47065') == Announce(NOPREPEND)
+	assert pfxd.viewkeys() == set(['wisc', 'ucla'])
+	assert pfxd.popitem()[0] in ('wisc', 'ucla')
+	pfxd.clear()
+	assert not pfxd
+	assert PrefixAnnounce.fromkeys(['x', 'y']) == {'x': Announce(),
+			'y': Announce()}
+
+	for bad in ['garbage', 'a; b: 47065', 'b: 47065; a', ' : 47065',
+			'b: 47065; : 47065']:
+		try:
+			PrefixAnnounce.from_str(bad)
+		except ValueError:
+			pass
+		else:
+			assert False
+
+	for proto in range(pickle.HIGHEST_PROTOCOL + 1):
+		for x in [Announce(), Announce(NOPREPEND), a, pfxa]:
+			y = pickle.loads(pickle.dumps(x, proto))
+			assert y == x
+			assert hash(y) == hash(x)
+			assert str(y) == str(x)
+		assert pickle.loads(pickle.dumps(a, proto)).poisoned == a.poisoned
+
+	# Protocol 0 pickle of Announce('704 {34 35} 47065') and protocol 2
+	# pickle of a closed PrefixAnnounce, both written before __slots__.
+	old = pickle.loads("ccopy_reg\n_reconstructor\np0\n(cannounce\nAnnounce\n"
+			"p1\nc__builtin__\nobject\np2\nNtp3\nRp4\n(dp5\nS'status'\np6\n"
+			"c__builtin__\nfrozenset\np7\n((lp8\nS'poisoned'\np9\n"
+			"aS'announced'\np10\natp11\nRp12\nsg9\ng7\n((lp13\nI704\naI34\n"
+			"aI35\natp14\nRp15\nsS'prepend'\np16\n(I704\ng7\n((lp17\nI34\n"
+			"aI35\natp18\nRp19\nI47065\ntp20\nsb.")
+	assert str(old) == '704 {34 35} 47065'
+	assert old.prepend == (704, (34, 35), HOMEASN)
+	old = pickle.loads('\x80\x02cannounce\nPrefixAnnounce\nq\x00)\x81q\x01'
+			'(U\x01gq\x02cannounce\nAnnounce\nq\x03)\x81q\x04}q\x05(U\x06'
+			'statusq\x06c__builtin__\nfrozenset\nq\x07]q\x08(U\tnoprependq\t'
+			'U\tannouncedq\ne\x85q\x0bRq\x0cU\x08poisonedq\rc__builtin__\n'
+			'set\nq\x0e]q\x0f\x85q\x10Rq\x11U\x07prependq\x12NubU\x01wq\x13'
+			'h\x03)\x81q\x14}q\x15(h\x06h\x07]q\x16(h\rh\ne\x85q\x17Rq\x18'
+			'h\rh\x07]q\x19(M\xc0\x02K"K#e\x85q\x1aRq\x1bh\x12M\xc0\x02h\x07]'
+			'q\x1c(K"K#e\x85q\x1dRq\x1eM\xd9\xb7\x87q\x1fubu}q U\n'
+			'identifierq!h\x07]q"(h\x02h\x04\x86q#h\x13h\x14\x86q$e\x85q%'
+			'Rq&sb.')
+	assert old.mux2str() == {'g': NOPREPEND, 'w': '704 {34 35} 47065'}
+	assert old.identifier is not None and hash(old) == hash(old.identifier)
+
+	pfxc = PrefixAnnounce.from_mux2str(pfxb.mux2str())
+	assert pfxc == pfxb
+	assert pfxc['wisc'] is PrefixAnnounce.from_str(str(pfxb))['wisc']
+
+	try:
+		pfxc['wisc'] <<= '47065 47065'
+	except TypeError:
+		pass
+	else:
+		assert False
+	pfxc['wisc'] = '47065 47065'
+	assert pfxc['wisc'] != pfxb['wisc']
+	assert str(pfxb['wisc']) == NOPREPEND
+	assert str(Announce.get(NOPREPEND)) == NOPREPEND
+
+	pfxc = PrefixAnnounce.from_mux2str({'wisc': [704, HOMEASN]})
+	assert str(pfxc) == 'wisc: 704 47065'
+	pfxc['wisc'] <<= NOPREPEND
 #}}}
 
 
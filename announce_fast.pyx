@@ -0,0 +1,69 @@
+# cython: language_level=2
+
+'''Compiled fast path for parsing AS path strings
+
+Build with `make fast`; `make test` builds it and runs the tests against
+it.  The announce module imports parse_as_path_string from here when the
+extension is available and keeps its pure-Python version otherwise.
+
+The scanner below only handles ASCII digits, whitespace, commas, and
+braces.  Any other input (signs, non-ASCII text, stray braces, overlong
+numbers) is handed to the pure-Python parser, so both parsers return the
+same tuples and raise the same errors.'''
+
+from announce import _parse_as_path_string_py
+
+# Longest run of digits that always fits in a C long.
+DEF MAX_DIGITS = 18
+
+
+def parse_as_path_string(string):#{{{
+	cdef bytes data
+	if type(string) is bytes:
+		data = string
+	else:
+		try:
+			data = string.encode('ascii')
+		except UnicodeError:
+			return _parse_as_path_string_py(string)
+
+	cdef const char *s = data
+	cdef Py_ssize_t i, n = len(data)
+	cdef char c
+	cdef long asn = 0
+	cdef int ndigits = 0
+	cdef bint in_set = False
+	cdef list prepend = list()
+	cdef set asset = None
+
+	for i in range(n + 1):
+		c = s[i] if i < n else 0
+		if c >= c'0' and c <= c'9':
+			if ndigits == MAX_DIGITS:
+				return _parse_as_path_string_py(string)
+			asn = asn * 10 + (c - c'0')
+			ndigits += 1
+			continue
+		if ndigits:
+			if in_set:
+				asset.add(asn)
+			else:
+				prepend.append(asn)
+			asn = 0
+			ndigits = 0
+		if c == c' ' or c == c',' or c == c'\t' or c == c'\n' or c == c'\r' \
+				or c == c'\v' or c == c'\f':
+			continue
+		if c == c'{' and not in_set:
+			in_set = True
+			asset = set()
+		elif c == c'}' and in_set:
+			prepend.append(tuple(sorted(asset)))
+			in_set = False
+		elif c == 0 and i == n:
+			if in_set:
+				prepend.append(tuple(sorted(asset)))
+		else:
+			return _parse_as_path_string_py(string)
+	return tuple(prepend)
+#}}}